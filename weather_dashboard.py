@@ -2,7 +2,13 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
+from plotly.subplots import make_subplots
 import numpy as np
+import requests
+import io
+import os
+import hashlib
+import time
 
 # Set page configuration
 st.set_page_config(layout="wide", page_title="Weather Data Dashboard", page_icon="🌤️")
@@ -13,16 +19,10 @@ def deduplicate_columns(df_columns):
     Ensures all column names are unique by appending a suffix to duplicates.
     Example: ['A', 'B', 'A'] -> ['A', 'B', 'A_1']
     """
-    new_cols = []
-    counts = {}
-    for col in df_columns:
-        cur_count = counts.get(col, 0)
-        if cur_count > 0:
-            new_cols.append(f"{col}_{cur_count}")
-        else:
-            new_cols.append(col)
-        counts[col] = cur_count + 1
-    return new_cols
+    cols = pd.Series(df_columns, dtype=str)
+    # Running count of each name; the first occurrence gets 0 and keeps its name
+    counts = cols.groupby(cols, sort=False).cumcount()
+    return np.where(counts > 0, cols + '_' + counts.astype(str), cols).tolist()
 
 # --- Page Title and Introduction ---
 st.title("🌤️ Weather Data Dashboard")
@@ -31,12 +31,31 @@ This dashboard visualizes pre-cleaned weather station data from a public GitHub
 """)
 
 # --- Function to load data ---
-@st.cache_data(ttl=600) # Cache data for 10 minutes
+CACHE_TTL_SECONDS = 600 # 10 minutes
+
+def parquet_cache_path(url):
+    """Local processed copy of the data at url; survives app restarts. One file per source URL."""
+    return f"WD_cache_{hashlib.sha1(url.encode()).hexdigest()[:12]}.parquet"
+
+@st.cache_resource(ttl=CACHE_TTL_SECONDS) # Shared by reference, so treat it as read-only
 def load_data_from_github(url):
     """Loads and processes pre-cleaned data from a raw GitHub URL."""
+    # A fresh local Parquet copy skips both the download and the CSV parse on a cold start
+    cache_path = parquet_cache_path(url)
+    if os.path.exists(cache_path) and time.time() - os.path.getmtime(cache_path) < CACHE_TTL_SECONDS:
+        try:
+            return pd.read_parquet(cache_path)
+        except Exception:
+            pass # Unreadable copy; fall back to fetching the CSV
+
     try:
+        # Download with requests (which asks for gzip and decompresses by default), then parse from memory.
+        response = requests.get(url, timeout=30)
+        response.raise_for_status()
+
         # Load the data. No need to skip headers as the file is clean.
-        df = pd.read_csv(url)
+        # The pyarrow engine parses the CSV multi-threaded and types numeric columns directly.
+        df = pd.read_csv(io.BytesIO(response.content), engine="pyarrow")
         
         # Clean and deduplicate column names to prevent errors
         cleaned_cols = df.columns.str.strip().str.replace('.', '', regex=False)
@@ -49,25 +68,205 @@ def load_data_from_github(url):
         
         for col in numeric_cols:
             if col in df.columns:
-                df[col] = pd.to_numeric(df[col], errors='coerce')
+                # Arrow already types clean columns as numbers; only columns holding stray text
+                # need the slower coercion pass
+                if not pd.api.types.is_numeric_dtype(df[col]):
+                    df[col] = pd.to_numeric(df[col], errors='coerce')
+                # float32 is plenty for display; it halves the memory of the cached frame and the
+                # plot frame, and the bytes Plotly serializes for each trace
+                df[col] = df[col].astype('float32')
 
         # --- Datetime Processing ---
         if 'Date' in df.columns and 'Time' in df.columns:
-            # Use dayfirst=True to handle dates like '13/04/23'
-            df['datetime'] = pd.to_datetime(df['Date'].astype(str) + ' ' + df['Time'].astype(str), errors='coerce', dayfirst=True)
+            # Dates are day-first ('13/04/23'), with some rows using a 4-digit year ('5/7/2023').
+            # Explicit formats skip per-row format inference; the second pass only sees the leftovers.
+            # Arrow-backed strings keep the concatenation in Arrow's vectorized kernels
+            timestamps = df['Date'].astype('string[pyarrow]') + ' ' + df['Time'].astype('string[pyarrow]')
+            df['datetime'] = pd.to_datetime(timestamps, format='%d/%m/%y %H:%M', errors='coerce')
+            unparsed = df['datetime'].isna()
+            if unparsed.any():
+                df.loc[unparsed, 'datetime'] = pd.to_datetime(timestamps[unparsed], format='%d/%m/%Y %H:%M', errors='coerce')
             df.dropna(subset=['datetime'], inplace=True)
             df.set_index('datetime', inplace=True)
             df.sort_index(inplace=True)
         else:
             st.error("Dataset must contain 'Date' and 'Time' columns.")
             return None
-            
+
+        # The local copy is optional: a read-only filesystem or an Arrow conversion error
+        # must not turn a successful load into a failure
+        try:
+            df.to_parquet(cache_path)
+        except Exception:
+            pass # The in-memory cache still works
+
         return df
         
     except Exception as e:
         st.error(f"Failed to load or process data. Error: {e}")
         return None
 
+# --- Function to prepare data for plotting ---
+@st.cache_resource(ttl=CACHE_TTL_SECONDS) # Shared by reference, so treat it as read-only
+def build_df_plot(data_key, _df):
+    """
+    Returns a copy of the data with NaN rows inserted at time gaps so Plotly breaks the lines.
+    data_key is a cheap fingerprint of the data; the frame itself is not hashed.
+    """
+    # Create a copy for plotting to avoid modifying the cached dataframe
+    df_plot = _df.copy()
+
+    # Identify time gaps greater than a threshold (e.g., 2 hours)
+    # np.diff on the raw datetime64 values avoids building a Series; comparing timedelta64
+    # values (not raw integers) keeps this correct whatever the index resolution is
+    gap_threshold = pd.Timedelta(hours=2)
+    # Positions of the first row after each gap, without padding a full-length boolean mask
+    gap_positions = np.flatnonzero(np.diff(df_plot.index.values) > gap_threshold.to_timedelta64()) + 1
+
+    # Insert a row with NaN values where a gap is detected
+    # This tells Plotly to create a break in the line
+    # All gap rows are built at once and merged with a single concat + sort
+    gap_starts = df_plot.index[gap_positions] - pd.Timedelta(seconds=1)
+    if len(gap_starts) > 0:
+        # Reindexing an empty slice gives all-NaN rows that keep each column's dtype (e.g. float32)
+        gap_rows = df_plot.iloc[:0].reindex(gap_starts)
+        df_plot = pd.concat([df_plot, gap_rows]).sort_index()
+
+    return df_plot
+
+# --- Helper Functions for Downsampling ---
+MAX_POINTS_PER_TRACE = 2000
+
+def lttb_indices(x, y, n_out):
+    """
+    Largest-Triangle-Three-Buckets: picks n_out indices that keep the visual shape of the line.
+    The first and last points are always kept; each bucket in between contributes the point
+    forming the largest triangle with the previous pick and the next bucket's average.
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_start, next_end = (edges[i + 1], edges[i + 2]) if i + 2 < len(edges) else (n - 1, n)
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+def downsample_columns(df_plot, columns, n_out=MAX_POINTS_PER_TRACE):
+    """
+    Thins each time-indexed column to about n_out points with LTTB, keeping NaN rows as line breaks.
+    Returns a dict of column name -> thinned Series; the time axis is converted once for all columns.
+    """
+    x_all = df_plot.index.values.view('i8').astype('float64')
+    traces = {}
+    for col in columns:
+        series = df_plot[col]
+        values = series.to_numpy(dtype='float64')
+        is_nan = np.isnan(values)
+        valid = np.flatnonzero(~is_nan)
+        if len(valid) <= n_out:
+            traces[col] = series
+            continue
+
+        keep = valid[lttb_indices(x_all[valid], values[valid], n_out)]
+        traces[col] = series.iloc[np.union1d(keep, np.flatnonzero(is_nan))]
+    return traces
+
+# --- Functions to build and render charts ---
+@st.cache_resource(ttl=CACHE_TTL_SECONDS) # Figure is reused until the plot data changes
+def build_trends_figure(data_key, _df_plot):
+    """
+    Builds one figure with a row per weather trend, all sharing the time axis.
+    data_key is a cheap fingerprint of the plot data; the frame itself is not hashed.
+    Returns None when none of the chart columns are present.
+    """
+    df_plot = _df_plot
+
+    # Each trace is thinned server-side with LTTB so the browser only receives what it can draw
+    chart_cols = [col for col in ['Temp', 'Pt', 'Speed', 'Rain', 'Rad'] if col in df_plot.columns]
+    traces = downsample_columns(df_plot, chart_cols)
+
+    # (subplot title, y-axis title, traces) for each chart that has data
+    # Scattergl traces are drawn with WebGL, which stays fast for long time series
+    panels = []
+    if 'Temp' in df_plot.columns and 'Pt' in df_plot.columns:
+        panels.append(("Temperature & Dew Point", "Temperature (°C)", [
+            go.Scattergl(x=traces['Temp'].index, y=traces['Temp'], mode='lines', name='Temp'),
+            go.Scattergl(x=traces['Pt'].index, y=traces['Pt'], mode='lines', name='Pt'),
+        ]))
+
+    if 'Speed' in df_plot.columns:
+        panels.append(("Wind Speed", "Speed (km/h)", [
+            go.Scattergl(x=traces['Speed'].index, y=traces['Speed'], mode='lines', name='Wind Speed'),
+        ]))
+
+    if 'Rain' in df_plot.columns:
+        # Use fill='tozeroy' to create an area chart effect
+        panels.append(("Cumulative Rainfall", "Rainfall (mm)", [
+            go.Scattergl(x=traces['Rain'].index, y=traces['Rain'], mode='lines', name='Rainfall', fill='tozeroy'),
+        ]))
+
+    if 'Rad' in df_plot.columns:
+        panels.append(("Solar Radiation", "Radiation (W/m²)", [
+            go.Scattergl(x=traces['Rad'].index, y=traces['Rad'], mode='lines', name='Solar Radiation', line=dict(color='orange')),
+        ]))
+
+    if not panels:
+        return None
+
+    # A single figure means one layout/template build and one JSON payload, and zooming
+    # the shared time axis moves every chart together
+    fig = make_subplots(
+        rows=len(panels), cols=1, shared_xaxes=True, vertical_spacing=0.06,
+        subplot_titles=[title for title, _, _ in panels],
+    )
+    for row, (_, y_title, panel_traces) in enumerate(panels, start=1):
+        for trace in panel_traces:
+            fig.add_trace(trace, row=row, col=1)
+        fig.update_yaxes(title_text=y_title, row=row, col=1)
+    fig.update_xaxes(title_text="Time", row=len(panels), col=1)
+    fig.update_layout(height=300 * len(panels), template="plotly_white", legend_title="Measurement")
+    return fig
+
+@st.fragment # Widget interactions inside the charts rerun only this section
+def render_charts(data_key, df_plot):
+    """Draws the weather trend charts from the gap-broken plot data."""
+    st.header("Weather Trends")
+
+    fig = build_trends_figure(data_key, df_plot)
+    if fig is not None:
+        st.plotly_chart(fig, use_container_width=True)
+
+# --- Helper Function for Metrics ---
+def display_metric(column, label, value, unit="", help_text=""):
+    """Shows a single metric in the given column, or "N/A" when the value is missing."""
+    with column:
+        if pd.notna(value):
+            st.metric(label=label, value=f"{value:.1f} {unit}", help=help_text)
+        else:
+            st.metric(label=label, value="N/A", help=help_text)
+
+# --- Function to render the data table ---
+@st.fragment # Changing the row count reruns only the table
+def render_data_table(df):
+    """Shows the most recent rows of the original, unmodified dataframe."""
+    st.header("Raw Data Viewer")
+    # Only the selected tail is serialized and sent to the browser
+    row_count = st.number_input(
+        "Rows to show (most recent)", min_value=1, max_value=len(df), value=min(2000, len(df)), step=500
+    )
+    st.dataframe(df.tail(int(row_count)))
+
 # --- Main App Logic ---
 
 # IMPORTANT: This URL points to your NEWLY CLEANED data file.
@@ -84,18 +283,18 @@ if df is not None and not df.empty:
     metric_cols = ['Temp', 'Hum', 'Speed', 'Bar']
     existing_metric_cols = [col for col in metric_cols if col in df.columns]
 
-    if not df.dropna(subset=existing_metric_cols).empty:
-        latest_data = df.dropna(subset=existing_metric_cols).iloc[-1]
+    # The index is time-sorted, so the latest valid row is almost always in the recent tail
+    metric_data = df[existing_metric_cols]
+    latest_slice = metric_data.tail(500).dropna()
+    if latest_slice.empty:
+        latest_slice = metric_data.dropna()
+
+    if not latest_slice.empty:
+        # Plain floats from the metric columns only, rather than a mixed-dtype row Series
+        latest_data = dict(zip(existing_metric_cols, latest_slice.to_numpy()[-1].tolist()))
         
         col1, col2, col3, col4 = st.columns(4)
 
-        def display_metric(column, label, value, unit="", help_text=""):
-            with column:
-                if pd.notna(value):
-                    st.metric(label=label, value=f"{value:.1f} {unit}", help=help_text)
-                else:
-                    st.metric(label=label, value="N/A", help=help_text)
-
         display_metric(col1, "🌡️ Temperature", latest_data.get('Temp'), "°C", "Outside Temperature")
         display_metric(col2, "💧 Humidity", latest_data.get('Hum'), "%", "Outside Humidity")
         display_metric(col3, "💨 Wind Speed", latest_data.get('Speed'), "km/h", "Current Wind Speed")
@@ -105,59 +304,15 @@ if df is not None and not df.empty:
 
 
     # --- Charts Section ---
-    # Create a copy for plotting to avoid modifying the cached dataframe
-    df_plot = df.copy()
+    # Row count and last timestamp change whenever new data arrives; the plot caches key on
+    # this instead of hashing the frames on every rerun
+    data_key = (len(df), df.index[-1].value)
+    df_plot = build_df_plot(data_key, df)
 
-    # Identify time gaps greater than a threshold (e.g., 2 hours)
-    time_diff = df_plot.index.to_series().diff()
-    gap_threshold = pd.Timedelta(hours=2)
-    
-    # Insert a row with NaN values where a gap is detected
-    # This tells Plotly to create a break in the line
-    gaps = df_plot[time_diff > gap_threshold].index
-    for gap_start in gaps:
-        gap_row = pd.DataFrame([pd.NA] * len(df_plot.columns)).T
-        gap_row.columns = df_plot.columns
-        gap_row.index = [gap_start - pd.Timedelta(seconds=1)]
-        df_plot = pd.concat([df_plot, gap_row]).sort_index()
-
-    st.header("Weather Trends")
-
-    if 'Temp' in df_plot.columns and 'Pt' in df_plot.columns:
-        st.subheader("Temperature & Dew Point")
-        # Use Plotly graph objects for more robust plotting with gaps
-        fig_temp = go.Figure()
-        fig_temp.add_trace(go.Scatter(x=df_plot.index, y=df_plot['Temp'], mode='lines', name='Temp'))
-        fig_temp.add_trace(go.Scatter(x=df_plot.index, y=df_plot['Pt'], mode='lines', name='Pt'))
-        fig_temp.update_layout(title="Temperature and Dew Point Over Time", xaxis_title="Time", yaxis_title="Temperature (°C)", template="plotly_white", legend_title="Measurement")
-        st.plotly_chart(fig_temp, use_container_width=True)
-
-    if 'Speed' in df_plot.columns:
-        st.subheader("Wind Speed")
-        fig_wind = go.Figure()
-        fig_wind.add_trace(go.Scatter(x=df_plot.index, y=df_plot['Speed'], mode='lines', name='Wind Speed'))
-        fig_wind.update_layout(title="Wind Speed Over Time", xaxis_title="Time", yaxis_title="Speed (km/h)", template="plotly_white")
-        st.plotly_chart(fig_wind, use_container_width=True)
-
-    if 'Rain' in df_plot.columns:
-        st.subheader("Cumulative Rainfall")
-        fig_rain = go.Figure()
-        # Use fill='tozeroy' to create an area chart effect
-        fig_rain.add_trace(go.Scatter(x=df_plot.index, y=df_plot['Rain'], mode='lines', name='Rainfall', fill='tozeroy'))
-        fig_rain.update_layout(title="Cumulative Rainfall", xaxis_title="Time", yaxis_title="Rainfall (mm)", template="plotly_white")
-        st.plotly_chart(fig_rain, use_container_width=True)
-
-    if 'Rad' in df_plot.columns:
-        st.subheader("Solar Radiation")
-        fig_solar = go.Figure()
-        fig_solar.add_trace(go.Scatter(x=df_plot.index, y=df_plot['Rad'], mode='lines', name='Solar Radiation', line=dict(color='orange')))
-        fig_solar.update_layout(title="Solar Radiation Over Time", xaxis_title="Time", yaxis_title="Radiation (W/m²)", template="plotly_white")
-        st.plotly_chart(fig_solar, use_container_width=True)
+    render_charts(data_key, df_plot)
 
     # --- Data Table ---
-    st.header("Raw Data Viewer")
-    # Show the original, unmodified dataframe
-    st.dataframe(df)
+    render_data_table(df)
 
 else:
     st.error("Could not load or display data. Please check the GitHub URL and file content.")